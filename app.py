@@ -5,13 +5,18 @@ A modular Streamlit application for analyzing Revolut financial data.
 This refactored version separates concerns into different modules for better maintainability.
 """
 
+import pandas as pd
 import streamlit as st
 from src.pages.auth_pages import login_page, change_password_page
 from src.pages.customize_data import customize_data_page
 from src.data.github_storage import github_repo
-from src.data.processing import load_statement, load_main_dataframe
+from src.data.processing import load_statement, load_main_dataframe, read_main_dataframe
 from src.utils.currency import get_user_currency, save_user_currency, CURRENCY_SYMBOLS
 
+# Copy-on-Write lets slices and filtered frames share memory until they are actually modified,
+# so pages don't need defensive .copy() calls on every rerun
+pd.options.mode.copy_on_write = True
+
 # Set page configuration
 st.set_page_config(
     page_title="Financial Dashboard", 
@@ -127,8 +132,11 @@ def main_sidebar():
                 st.info("🛡️ **Admin User**")
         
         if st.button("Logout"):
+            # Drop the user's decrypted dataframe from the shared cache
+            if not st.session_state.is_guest:
+                read_main_dataframe.clear(st.session_state.username)
             # Reset session state
-            for key in ["logged_in", "username", "is_guest", "guest_dataframe", "show_welcome_toast"]:
+            for key in ["logged_in", "username", "is_guest", "guest_dataframe", "show_welcome_toast", "setup_checked_for"]:
                 if key in st.session_state:
                     del st.session_state[key]
             st.session_state.categories = {"Uncategorized": []}
@@ -149,12 +157,14 @@ def main_app():
         return
 
     # Check if user has data. If not, show setup page.
-    if not st.session_state.is_guest:
+    # Once the check passes it is remembered for this user, so reruns don't re-read the dataframe from GitHub
+    if not st.session_state.is_guest and st.session_state.get("setup_checked_for") != st.session_state.username:
         user_currency = get_user_currency(st.session_state.username)
         main_df = load_main_dataframe()
         if not user_currency or main_df is None:
             initial_setup_page()
             return
+        st.session_state.setup_checked_for = st.session_state.username
     
     # Show GitHub storage warning for non-guest users
     if not github_repo and not st.session_state.is_guest:
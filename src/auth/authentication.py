@@ -142,7 +142,7 @@ def change_password(username, old_password, new_password, confirm_password):
 
     # 2. Get user data files
     files = get_user_files(username)
-    files_to_reencrypt = [files["dataframe"], files["categories"]]
+    files_to_reencrypt = [files["dataframe"], files["legacy_dataframe"], files["categories"]]
 
     # 3. Decrypt with old key, re-encrypt with new key
     for file_path in files_to_reencrypt:
@@ -31,18 +31,32 @@ def get_user_files(username):
     """Get file paths for a user's data"""
     if username == "admin":
         return {
-            "dataframe": "data/dataframes/main_dataframe.csv",
+            "dataframe": "data/dataframes/main_dataframe.parquet",
+            "legacy_dataframe": "data/dataframes/main_dataframe.csv",
             "categories": "data/categories/categories.json",
             "currency": "data/currency/main_currency.json"
         }
     else:
         return {
-            "dataframe": f"data/dataframes/{username}_dataframe.csv",
+            "dataframe": f"data/dataframes/{username}_dataframe.parquet",
+            "legacy_dataframe": f"data/dataframes/{username}_dataframe.csv",
             "categories": f"data/categories/{username}_categories.json",
             "currency": f"data/currency/{username}_currency.json"
         }
 
 
+def github_file_exists(file_path):
+    """Check whether a file exists in the GitHub repository without reading it"""
+    if not github_repo:
+        return False
+    
+    try:
+        github_repo.get_contents(file_path, ref=GITHUB_BRANCH)
+        return True
+    except Exception:
+        return False
+
+
 def ensure_github_file_exists(file_path, default_content="{}"):
     """Ensure a GitHub file exists, create it if it doesn't"""
     if not github_repo:
@@ -1,10 +1,14 @@
 """Data processing functionality for financial data."""
 
+import base64
+import hashlib
+import re
+import numpy as np
 import pandas as pd
 import streamlit as st
 import json
 from datetime import datetime
-from io import StringIO
+from io import BytesIO, StringIO
 from ..utils.currency import CURRENCY_DECIMALS
 from ..data.github_storage import (
     read_encrypted_github_file, 
@@ -13,6 +17,19 @@ from ..data.github_storage import (
     ensure_github_file_exists
 )
 
+# Statement columns with only a few distinct values, stored as categoricals
+LOW_CARDINALITY_DTYPES = {"Type": "category", "Product": "category"}
+
+try:
+    import ahocorasick
+except ImportError:  # build_keyword_matcher falls back to a compiled regex
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:  # categories are read and written with the stdlib json module instead
+    orjson = None
+
 
 def load_user_data(username):
     """Load user's categories and other data"""
@@ -25,7 +42,7 @@ def load_user_data(username):
     categories_content = read_encrypted_github_file(files["categories"], username)
     if categories_content:
         try:
-            st.session_state.categories = json.loads(categories_content)
+            st.session_state.categories = orjson.loads(categories_content) if orjson else json.loads(categories_content)
         except:
             st.session_state.categories = {"Uncategorized": []}
     else:
@@ -33,11 +50,68 @@ def load_user_data(username):
         st.session_state.categories = {"Uncategorized": []}
 
 
+@st.cache_resource(show_spinner=False, max_entries=16)
+def parse_statement(cache_key, currency, _raw):
+    """Parse raw CSV statement bytes into a cleaned dataframe, without categories.
+
+    Cached as a shared resource keyed on a cheap identifier of the file bytes, so widget reruns
+    skip both re-parsing and Streamlit's own hashing/pickling of the result.
+    Callers must copy the returned dataframe (a shallow copy under Copy-on-Write) before modifying it.
+    Returns the cleaned dataframe and the rows dropped for an invalid Balance.
+    """
+    # Skip unused columns and parse dates inside the parser instead of dropping/converting afterwards.
+    # The multithreaded pyarrow engine needs an explicit column list, so read the header first.
+    unused_columns = {"Fee", "Completed Date", "Currency", "State"}
+    header = pd.read_csv(BytesIO(_raw), nrows=0).columns
+    df = pd.read_csv(
+        BytesIO(_raw),
+        engine="pyarrow",
+        usecols=[col for col in header if col not in unused_columns],
+        dtype={"Amount": "float64"},
+        parse_dates=["Started Date"]
+    )
+
+    # One mask for both spellings of interest rows instead of two filtering passes
+    df = df[~df["Type"].isin(["INTEREST", "Interest"])]
+    df = df.rename(columns={"Started Date": "Date"})
+
+    # Hide internal transfers: currency exchanges, Revolut-user top-ups and savings moves on the current account.
+    # The rules are OR-ed into one mask and assigned once instead of four separate .loc writes.
+    description = df['Description']
+    df["Hide"] = (
+        description.str.contains(f'To {currency}', case=False, na=False)
+        | (description == 'Transfer from Revolut user')
+        | ((df['Product'] == 'Current') & description.isin(['From Savings Account', 'To Savings Account']))
+    )
+
+    # Round amounts based on currency decimal rules
+    decimals = CURRENCY_DECIMALS.get(currency, 2)
+    if decimals == 0:
+        df['Amount'] = df['Amount'].round().astype(int)
+    else:
+        df['Amount'] = df['Amount'].round(decimals)
+
+    df['Balance'] = pd.to_numeric(df['Balance'], errors='coerce').round()
+    dropped_rows = df[df['Balance'].isnull()]
+    # No nulls are left after the drop, so use plain int64 instead of the masked nullable Int64
+    df = df.dropna(subset=['Balance']).astype({'Balance': 'int64'})
+    # Arrow-backed strings hand straight to Streamlit's Arrow serialization
+    df['Description'] = df['Description'].astype('string[pyarrow]')
+    # Only a handful of distinct values, so filters compare small integer codes instead of strings
+    df = df.astype(LOW_CARDINALITY_DTYPES)
+    # Keep rows in Date order so slice_date_range can binary-search them
+    df = df.sort_values('Date', kind='stable', ignore_index=True)
+
+    return df, dropped_rows
+
+
 def load_statement(file, currency):
     """Load and process a CSV statement file"""
     try: 
-        df = pd.read_csv(file)
-        
+        raw = file.getvalue()
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+
         # Use the user-selected currency
         detected_currency = currency
         
@@ -47,151 +121,237 @@ def load_statement(file, currency):
                 st.session_state['currency'] = detected_currency
             else:
                 st.session_state[f"{st.session_state.username}_currency"] = detected_currency
-        
-        # Drop columns that exist in the dataframe
-        columns_to_drop = []
-        for col in ["Fee", "Completed Date", "Currency", "State"]:
-            if col in df.columns:
-                columns_to_drop.append(col)
-        
-        if columns_to_drop:
-            df = df.drop(columns_to_drop, axis=1)
-            
-        df = df[df["Type"] != "INTEREST"]
-        df = df[df["Type"] != "Interest"]
-        df['Started Date'] = pd.to_datetime(df['Started Date'])
-        df = df.rename(columns={"Started Date": "Date"})
-
-        df["Hide"] = False 
-        # Update currency-specific hiding rules to be more generic
-        df.loc[df['Description'].str.contains(f'To {detected_currency}', case=False, na=False), 'Hide'] = True
-        df.loc[df['Description'] == 'Transfer from Revolut user', 'Hide'] = True
-        df.loc[(df['Product'] == 'Current') & (df['Description'] == 'From Savings Account'), 'Hide'] = True
-        df.loc[(df['Product'] == 'Current') & (df['Description'] == 'To Savings Account'), 'Hide'] = True
-
-        # Round amounts based on currency decimal rules
-        decimals = CURRENCY_DECIMALS.get(detected_currency, 2)
-        if decimals == 0:
-            df['Amount'] = df['Amount'].round().astype(int)
-        else:
-            df['Amount'] = df['Amount'].round(decimals)
 
-        try:
-            df['Balance'] = pd.to_numeric(df['Balance'], errors='coerce').round().astype('Int64')
-            dropped_rows = df[df['Balance'].isnull()]
-            
-            if not dropped_rows.empty:
-                st.warning(f"Dropped {len(dropped_rows)} rows due to invalid or null Balance:")
-                for index, row in dropped_rows.iterrows():
-                    st.warning(f"{row['Description']} {row['Amount']}")
-                
-            df = df.dropna(subset=['Balance'])
-        except Exception as e:
-            st.error(f"Error processing Balance column: {str(e)}")
-            st.stop()
-
-        return categorize_transactions(df)
+        # Uploads already carry a unique file_id, so only in-memory files (demo data) need hashing
+        cache_key = getattr(file, "file_id", None) or hashlib.blake2b(raw, digest_size=16).hexdigest()
+        df, dropped_rows = parse_statement(cache_key, detected_currency, raw)
+
+        if not dropped_rows.empty:
+            # One warning and one table instead of a separate warning element per dropped row
+            st.warning(f"Dropped {len(dropped_rows)} rows due to invalid or null Balance:")
+            st.dataframe(dropped_rows[["Description", "Amount"]], hide_index=True)
+
+        # Categories live in session state and change independently, so keep them out of the cache
+        # A shallow copy is enough: under Copy-on-Write adding Category never touches the cached frame
+        return categorize_transactions(df.copy(deep=False))
     except Exception as e:
         st.error(f"Error reading the file: {str(e)}")
         return None
 
 
+@st.cache_data(show_spinner=False, max_entries=32, ttl=900)
+def read_main_dataframe(username):
+    """Fetch, decrypt and parse a user's main dataframe.
+
+    Cached per username so reruns skip the GitHub round-trip; save_main_dataframe and logout clear the entry,
+    and the TTL drops decrypted data left behind by sessions that end without logging out.
+    """
+    files = get_user_files(username)
+    parquet_content = read_encrypted_github_file(files["dataframe"], username)
+    if parquet_content:
+        # Parquet keeps the column dtypes, so nothing needs re-parsing; only the string storage isn't recorded
+        df = pd.read_parquet(BytesIO(base64.b64decode(parquet_content)))
+        df['Description'] = df['Description'].astype('string[pyarrow]')
+        # Merging uploads concatenates mismatched categoricals into object, so recast on every load.
+        # Older saves stored Balance as nullable Int64.
+        df = df.astype({**LOW_CARDINALITY_DTYPES, 'Balance': 'int64'})
+    else:
+        # Users who haven't saved since the switch to Parquet still have a CSV; the next save migrates it
+        csv_content = read_encrypted_github_file(files["legacy_dataframe"], username)
+        if not csv_content:
+            return None
+
+        df = pd.read_csv(StringIO(csv_content), dtype={"Description": "string[pyarrow]", **LOW_CARDINALITY_DTYPES})
+        df['Date'] = pd.to_datetime(df['Date'])
+
+    # Merged uploads are appended at the end, so restore Date order for slice_date_range
+    return df.sort_values('Date', kind='stable', ignore_index=True)
+
+
 def load_main_dataframe():
     """Load the main dataframe for the current user"""
     if st.session_state.is_guest:
         return None
     
-    files = get_user_files(st.session_state.username)
-    csv_content = read_encrypted_github_file(files["dataframe"], st.session_state.username)
-    
-    if csv_content:
-        try:
-            df = pd.read_csv(StringIO(csv_content))
-            df['Date'] = pd.to_datetime(df['Date'])
-            return df
-        except Exception as e:
-            st.error(f"Error loading dataframe: {str(e)}")
-            return None
-    else:
+    try:
+        df = read_main_dataframe(st.session_state.username)
+    except Exception as e:
+        st.error(f"Error loading dataframe: {str(e)}")
         return None
 
+    if df is None:
+        # Don't remember a missing dataframe, the setup page is about to create it
+        read_main_dataframe.clear(st.session_state.username)
+    return df
+
 
 def load_main_spending_dataframe():
     """Load main dataframe filtered for spending analysis"""
     if st.session_state.is_guest:
-        if 'guest_dataframe' in st.session_state:
-            main_df = st.session_state.guest_dataframe.copy()
-            main_df = main_df[main_df['Hide'] == False]
-            main_df = main_df[main_df['Product'] != 'Deposit']
-            return main_df
-        return None
-    
-    main_df = load_main_dataframe()
+        main_df = st.session_state.get('guest_dataframe')
+    else:
+        main_df = load_main_dataframe()
+
     if main_df is not None:
-        main_df = main_df[main_df['Hide'] == False].copy()
-        main_df = main_df[main_df['Product'] != 'Deposit']
+        # Boolean indexing already returns a new frame, so no extra copy is needed
+        main_df = main_df[~main_df['Hide'] & (main_df['Product'] != 'Deposit')]
     return main_df
 
 
+def slice_date_range(df, start_date, end_date):
+    """Slice a Date-sorted dataframe to rows from start_date (inclusive) to end_date (exclusive).
+
+    Both loaders return rows sorted by Date, so the bounds are found by binary search
+    instead of comparing every row.
+    """
+    start, end = df['Date'].searchsorted([start_date, end_date])
+    return df.iloc[start:end]
+
+
 def merge_dataframes(main_df, new_df):
     """Merge new data with existing dataframe"""
-    combined_df = pd.concat([main_df, new_df]).drop_duplicates(subset=['Date', 'Description', 'Balance'], keep='first')
-    num_new_rows = len(combined_df) - len(main_df)
-    return combined_df, num_new_rows
+    # Anti-join on the transaction key so only the incoming rows are hashed and deduplicated,
+    # instead of concatenating everything and deduplicating the whole history again
+    key = ['Date', 'Description', 'Balance']
+    # A duplicate shares its Date, so only history from the statement's first day onward can match.
+    # main_df is Date-sorted, so that tail is found by binary search rather than comparing every row
+    overlap = main_df.iloc[main_df['Date'].searchsorted(new_df['Date'].min()):][key]
+    is_new = ~pd.MultiIndex.from_frame(new_df[key]).isin(pd.MultiIndex.from_frame(overlap))
+    new_rows = new_df[is_new].drop_duplicates(subset=key, keep='first')
+    if new_rows.empty:
+        return main_df, 0
+
+    combined_df = pd.concat([main_df, new_rows], ignore_index=True)
+    return combined_df, len(new_rows)
 
 
 def save_main_dataframe(df):
-    """Save the main dataframe"""
+    """Save the main dataframe, returning whether it was stored"""
     if st.session_state.is_guest:
-        return
+        return False
     
     files = get_user_files(st.session_state.username)
-    csv_content = df.to_csv(index=False)
+    # Storage is text (encrypted for regular users), so the Parquet bytes are base64-encoded
+    parquet_content = base64.b64encode(df.to_parquet(index=False, compression="zstd")).decode('utf-8')
     
     commit_message = f"Update dataframe for user {st.session_state.username} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    success = write_encrypted_github_file(files["dataframe"], csv_content, commit_message, st.session_state.username)
+    success = write_encrypted_github_file(files["dataframe"], parquet_content, commit_message, st.session_state.username)
     
     if success:
+        read_main_dataframe.clear(st.session_state.username)
         st.success("✅ Data saved")
     else:
         st.error("❌ Failed to save data")
+    return success
 
 
 def save_categories():
     """Save user categories"""
+    # Every category change goes through here; bumping the version invalidates the keyword automaton
+    st.session_state.categories_version = st.session_state.get("categories_version", 0) + 1
+
     if st.session_state.is_guest:
         return
     
     files = get_user_files(st.session_state.username)
-    categories_content = json.dumps(st.session_state.categories, indent=2)
+    if orjson is not None:
+        categories_content = orjson.dumps(st.session_state.categories, option=orjson.OPT_INDENT_2).decode()
+    else:
+        categories_content = json.dumps(st.session_state.categories, indent=2)
     
     commit_message = f"Update categories for user {st.session_state.username} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
     success = write_encrypted_github_file(files["categories"], categories_content, commit_message, st.session_state.username)
 
 
-def categorize_transactions(df):
-    """Categorize transactions based on user-defined categories"""
-    df["Category"] = "Uncategorized"
-
-    for category, keywords in st.session_state.categories.items():
-        if category == "Uncategorized" or not keywords:
+def build_keyword_matcher(categories):
+    """Build a function mapping lowered descriptions to the category of their leftmost-longest keyword"""
+    keyword_to_category = {}
+    for category, keywords in categories.items():
+        if category == "Uncategorized":
             continue
+        for keyword in keywords:
+            keyword = keyword.lower().strip()
+            if keyword:
+                # Later categories win for duplicate keywords, as before
+                keyword_to_category[keyword] = category
 
-        lowered_keywords = [keyword.lower().strip() for keyword in keywords]
-        for idx, row in df.iterrows():
-            details = row["Description"].lower().strip()
+    if not keyword_to_category:
+        return None
 
-            if details in lowered_keywords:
-                df.at[idx, "Category"] = category
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword, category in keyword_to_category.items():
+            automaton.add_word(keyword, category)
+        automaton.make_automaton()
+
+        def match_category(description):
+            for _, category in automaton.iter_long(description):
+                return category
+            return "Uncategorized"
+
+        scan = lambda descriptions: descriptions.map(match_category)
+    else:
+        # Without pyahocorasick, scan with one compiled alternation; longest keywords first gives leftmost-longest
+        pattern = "(" + "|".join(sorted(map(re.escape, keyword_to_category), key=len, reverse=True)) + ")"
+        scan = lambda descriptions: (
+            descriptions.str.extract(pattern, expand=False).map(keyword_to_category).fillna("Uncategorized")
+        )
+
+    def match_categories(descriptions):
+        # Most keywords are whole descriptions picked in the editor, so resolve exact matches with one
+        # hashed map and only substring-scan the rest. A whole-string match is always the leftmost-longest one.
+        categories = descriptions.map(keyword_to_category)
+        unmatched = categories.isna()
+        if unmatched.any():
+            categories[unmatched] = scan(descriptions[unmatched])
+        return categories
+
+    return match_categories
+
+
+def get_keyword_matcher():
+    """Get the keyword matcher for the current categories, rebuilding it only when they change"""
+    categories = st.session_state.categories
+    version = st.session_state.get("categories_version", 0)
+    cached = st.session_state.get("keyword_matcher")
+
+    # The identity check catches categories being replaced wholesale (login, logout, guest mode)
+    if cached is None or cached[0] != version or cached[1] is not categories:
+        cached = (version, categories, build_keyword_matcher(categories))
+        st.session_state.keyword_matcher = cached
+    return cached[2]
+
+
+def get_category_dtype():
+    """Get the categorical dtype spanning the user's category names"""
+    return pd.CategoricalDtype(list(dict.fromkeys(["Uncategorized", *st.session_state.categories])))
+
+
+def categorize_transactions(df):
+    """Categorize transactions based on user-defined categories"""
+    category_dtype = get_category_dtype()
+    match_categories = get_keyword_matcher()
+    if match_categories is None:
+        # No keywords yet (e.g. first upload): skip normalizing descriptions entirely.
+        # "Uncategorized" is always code 0, so the column is just a zeroed codes array.
+        df["Category"] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), dtype=category_dtype)
+        return df
+
+    normalized = df["Description"].fillna("").str.lower().str.strip()
+    df["Category"] = match_categories(normalized).astype(category_dtype)
 
     return df
 
 
-def add_keyword_to_category(category, keyword):
-    """Add a keyword to a category"""
+def add_keyword_to_category(category, keyword, save=True):
+    """Add a keyword to a category.
+
+    Pass save=False when adding keywords in bulk and call save_categories() once afterwards.
+    """
     keyword = keyword.strip()
     if keyword and keyword not in st.session_state.categories.get(category, []):
         st.session_state.categories[category].append(keyword)
-        save_categories()
+        if save:
+            save_categories()
         return True
     return False
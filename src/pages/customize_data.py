@@ -1,19 +1,35 @@
 """Data customization page for editing transactions and categories."""
 
 import time
+import numpy as np
 import pandas as pd
 import streamlit as st
 from ..data.processing import (
     load_main_dataframe, 
     load_statement, 
+    slice_date_range,
     merge_dataframes, 
     save_main_dataframe,
     categorize_transactions,
+    get_category_dtype,
     add_keyword_to_category,
     save_categories
 )
 
 
+@st.cache_resource(show_spinner=False)
+def build_column_config(columns, category_options):
+    """Build the data editor column config, reused until the columns or categories change"""
+    column_config = {col: st.column_config.Column(col, disabled=True) for col in columns if col not in ['Hide', 'Amount']}
+    column_config['Category'] = st.column_config.SelectboxColumn(
+        "Category",
+        options=list(category_options)
+    )
+    column_config['Hide'] = st.column_config.CheckboxColumn('Hide')
+    column_config['Amount'] = st.column_config.NumberColumn('Amount')
+    return column_config
+
+
 def customize_data_page():
     """Page for customizing and editing transaction data"""
     if st.session_state.is_guest:
@@ -21,7 +37,7 @@ def customize_data_page():
         if 'guest_dataframe' not in st.session_state:
             st.error("No data available. Please upload a CSV file first.")
             return
-        main_df = st.session_state.guest_dataframe.copy()
+        main_df = st.session_state.guest_dataframe
     else:
         st.title("Main DataFrame")
         main_df = load_main_dataframe()
@@ -40,7 +56,8 @@ def customize_data_page():
             )
 
         with col2:
-            type_options = ['ALL'] + list(main_df['Type'].unique())
+            # Type is categorical, so its categories list the options without scanning the column
+            type_options = ['ALL'] + list(main_df['Type'].cat.categories)
             selected_type = st.selectbox("Filter by Type", options=type_options)
             
         with col3:
@@ -48,13 +65,15 @@ def customize_data_page():
             selected_transaction_type = st.selectbox("Filter by transaction type", options=transaction_type_options)
 
         if st.checkbox("I'd like to add a new category"):
-            col1, _ = st.columns([2, 7])
-            with col1:
-                new_category = st.text_input("Enter new category name:")
-                
-            st.markdown("> **Note:** To only categorize a single transaction, put '!' at the beginning of the category name. (Not implemented yet)")
+            # Form so typing the name doesn't rerun the whole page on every keystroke
+            with st.form("add_category_form", clear_on_submit=True):
+                col1, _ = st.columns([2, 7])
+                with col1:
+                    new_category = st.text_input("Enter new category name:")
+                    
+                st.markdown("> **Note:** To only categorize a single transaction, put '!' at the beginning of the category name. (Not implemented yet)")
 
-            add_button = st.button("Add category")
+                add_button = st.form_submit_button("Add category")
 
             if add_button and new_category:
                 if new_category not in st.session_state.categories:
@@ -62,56 +81,63 @@ def customize_data_page():
                     save_categories()
                     st.rerun()
 
-        # Apply filters
-        if selected_type == 'ALL':
-            type_filter = main_df['Type'].notnull()
-        else:
-            type_filter = main_df['Type'] == selected_type
+        # Apply filters: binary-search the date range, then mask only the filters that are actually set
+        start_date = pd.Timestamp(selected_date_range[0])
+        end_date = pd.Timestamp(selected_date_range[1]) + pd.Timedelta(days=1)
+        filtered_df = slice_date_range(main_df, start_date, end_date)
 
-        if selected_transaction_type == 'ALL':
-            transaction_type_filter = main_df['Amount'].notnull()
-        elif selected_transaction_type == 'Credits':
-            transaction_type_filter = main_df['Amount'] < 0
+        if selected_type != 'ALL':
+            filtered_df = filtered_df[filtered_df['Type'] == selected_type]
+
+        if selected_transaction_type == 'Credits':
+            filtered_df = filtered_df[filtered_df['Amount'] < 0]
         elif selected_transaction_type == 'Debits':
-            transaction_type_filter = main_df['Amount'] > 0
-
-        filtered_df = main_df[
-            (main_df['Date'].dt.date >= selected_date_range[0]) &
-            (main_df['Date'].dt.date <= selected_date_range[1]) &
-            type_filter &
-            transaction_type_filter
-        ]
-
-        filtered_df = categorize_transactions(filtered_df)
-        filtered_df = filtered_df.sort_values(by='Date', ascending=False)
-
-        # Configure data editor
-        column_config = {col: st.column_config.Column(col, disabled=True) for col in filtered_df.columns if col not in ['Hide', 'Amount']}
-        column_config['Category'] = st.column_config.SelectboxColumn(
-            "Category",
-            options=list(st.session_state.categories.keys())
-        )
-        column_config['Hide'] = st.column_config.CheckboxColumn('Hide')
-        column_config['Amount'] = st.column_config.NumberColumn('Amount')
-
-        main_df_to_edit = st.data_editor(filtered_df, column_config=column_config)
-
-        if st.button("Apply Changes"):
-            for idx, row in main_df_to_edit.iterrows():
-                new_category = row["Category"]
-                new_hide_status = row["Hide"]
-                new_amount = row["Amount"]
-                details = row["Description"]
-
-                if new_category != main_df.at[idx, "Category"]:
-                    add_keyword_to_category(new_category, details)
-                    main_df.at[idx, "Category"] = new_category
-                
-                if new_hide_status != main_df.at[idx, "Hide"]:
-                    main_df.at[idx, "Hide"] = new_hide_status
-                
-                if new_amount != main_df.at[idx, "Amount"]:
-                    main_df.at[idx, "Amount"] = new_amount
+            filtered_df = filtered_df[filtered_df['Amount'] > 0]
+
+        # main_df stores the authoritative Category (set on upload and on Apply Changes), so don't
+        # recategorize per rerun; just widen the dtype to include categories added since the last save.
+        # Stored categories that no longer exist would become NaN, so those views are recategorized instead.
+        category_dtype = get_category_dtype()
+        if filtered_df["Category"].isin(category_dtype.categories).all():
+            filtered_df = filtered_df.astype({"Category": category_dtype})
+        else:
+            filtered_df = categorize_transactions(filtered_df)
+        # Rows are already in Date order, so newest-first is just a reversal
+        filtered_df = filtered_df.iloc[::-1]
+
+        column_config = build_column_config(tuple(filtered_df.columns), tuple(st.session_state.categories))
+
+        # Batch editor interactions into a single rerun on submit
+        with st.form("edit_transactions_form"):
+            main_df_to_edit = st.data_editor(filtered_df, column_config=column_config)
+            apply_changes = st.form_submit_button("Apply Changes")
+
+        if apply_changes:
+            # Widen the categorical to include categories added since main_df was categorized
+            main_df["Category"] = main_df["Category"].astype(get_category_dtype())
+
+            # Diff the edited rows against main_df column-wise instead of row by row.
+            # Resolve the edited labels to positions once and write each changed column with one iloc assignment.
+            positions = main_df.index.get_indexer(main_df_to_edit.index)
+            original_df = main_df.iloc[positions]
+            new_categories = main_df_to_edit["Category"].to_numpy()
+            category_changed = new_categories != original_df["Category"].to_numpy()
+
+            categories_changed = False
+            descriptions = main_df_to_edit["Description"].to_numpy()
+            for i in np.flatnonzero(category_changed & ~pd.isna(new_categories)):
+                # Collect keyword additions and persist categories once after the loop
+                if add_keyword_to_category(new_categories[i], descriptions[i], save=False):
+                    categories_changed = True
+
+            for col in ("Category", "Hide", "Amount"):
+                new_values = main_df_to_edit[col].to_numpy()
+                changed = category_changed if col == "Category" else new_values != original_df[col].to_numpy()
+                if changed.any():
+                    main_df.iloc[positions[changed], main_df.columns.get_loc(col)] = new_values[changed]
+
+            if categories_changed:
+                save_categories()
 
             main_df = categorize_transactions(main_df)
             
@@ -139,7 +165,8 @@ def customize_data_page():
             
             from ..utils.currency import get_user_currency
 
-            if upload_file is not None:
+            # The file stays in the uploader across reruns; only merge and save it the first time we see it
+            if upload_file is not None and st.session_state.get("merged_upload_id") != upload_file.file_id:
                 user_currency = get_user_currency(st.session_state.username)
                 new_df = load_statement(upload_file, user_currency)
                 if new_df is not None:
@@ -149,11 +176,12 @@ def customize_data_page():
                         updated_df = new_df
                         num_new_rows = len(new_df)
                     
-                    save_main_dataframe(updated_df)
-
                     if num_new_rows == 0:
+                        st.session_state.merged_upload_id = upload_file.file_id
                         st.info("No new rows to merge. The main DataFrame is already up to date.")
-                    else:
+                    # A failed save leaves the upload unmarked so the next rerun retries it
+                    elif save_main_dataframe(updated_df):
+                        st.session_state.merged_upload_id = upload_file.file_id
                         st.info(f"Successfully added {num_new_rows} new rows into the main DataFrame. Refresh the page!")
                         st.info("Due to streamlits limitations, you will be asked to login again!")
                         st.toast("Data successfully uploaded! Refresh the page and login", icon="🔄")
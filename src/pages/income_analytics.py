@@ -5,6 +5,31 @@ import streamlit as st
 import plotly.express as px
 from ..data.processing import load_main_dataframe
 from ..utils.currency import get_user_currency, format_currency
+from ..utils.ui_helpers import thin_for_plot
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_monthly_income_chart(monthly_income_trend, user_currency):
+    """Build the monthly income bar chart, reused while the monthly totals are unchanged"""
+    fig_income_trend = px.bar(
+        monthly_income_trend,
+        x='Month',
+        y='Amount',
+        title='Monthly Income Distribution',
+        labels={'Amount': 'Income Amount', 'Month': 'Month'},
+        text_auto=True,
+        color='Amount',
+        color_continuous_scale='Viridis'
+    )
+    fig_income_trend.update_traces(
+        hovertemplate='Income: %{y:,.0f} ' + user_currency + '<extra></extra>'
+    )
+    fig_income_trend.update_layout(
+        xaxis_title="Month",
+        yaxis_title=f"Income ({user_currency})",
+        xaxis={'categoryorder': 'array', 'categoryarray': monthly_income_trend['Month'].tolist()}
+    )
+    return fig_income_trend
 
 
 def income_analytics_page():
@@ -15,7 +40,7 @@ def income_analytics_page():
         if 'guest_dataframe' not in st.session_state:
             st.error("No data available. Please upload a CSV file first.")
             return
-        main_df = st.session_state.guest_dataframe.copy()
+        main_df = st.session_state.guest_dataframe
         st.warning("Monthly income metrics aren't functional in guest mode as it calculates the last three months from the present time of viewing.")
     else:
         main_df = load_main_dataframe()
@@ -30,25 +55,18 @@ def income_analytics_page():
         user_currency = "HUF"
         st.warning("No currency set for user, defaulting to HUF.")
 
-    income_df = main_df[main_df['Amount'] > 0].copy()
-    income_df = income_df[income_df['Hide'] == False]
-    income_df = income_df[income_df['Product'] == 'Current']
+    # Combine the predicates so each frame is sliced once
+    visible = ~main_df['Hide']
+    income_df = main_df[visible & (main_df['Amount'] > 0) & (main_df['Product'] == 'Current')]
+    savings_df = main_df[visible & (main_df['Product'] == 'Deposit')]
 
-    savings_df = main_df[main_df['Product'] == 'Deposit'].copy()
-    savings_df = savings_df[savings_df['Hide'] == False]
-    savings_df = savings_df.sort_values(by='Date')
-
-    monthly_incomes = []
-    monthly_savings = []
-    
-    for i in range(4):
-        month_num = (pd.Timestamp.now().month - i - 1) % 12 + 1 
-        month_data = income_df[income_df['Date'].dt.month == month_num]
-        monthly_incomes.append(month_data['Amount'].sum())
-
-        if i != 4:
-            savings_data = savings_df[savings_df['Date'].dt.month == month_num]
-            monthly_savings.append(abs(savings_data['Amount'].sum()))
+    # Total each month once, then look up the current and previous three months.
+    # Keying on periods rather than month numbers also keeps e.g. last year's March out of this March.
+    income_by_month = income_df.groupby(income_df['Date'].dt.to_period('M'))['Amount'].sum()
+    savings_by_month = savings_df.groupby(savings_df['Date'].dt.to_period('M'))['Amount'].sum().abs()
+    recent_months = pd.period_range(end=pd.Timestamp.now(), periods=4, freq='M')[::-1]
+    monthly_incomes = income_by_month.reindex(recent_months, fill_value=0).to_numpy()
+    monthly_savings = savings_by_month.reindex(recent_months, fill_value=0).to_numpy()
 
     # Display monthly income metrics
     col1, col2, col3 = st.columns(3)
@@ -103,11 +121,7 @@ def income_analytics_page():
             
             for year in selected_years:
                 for month in selected_months:
-                    month_data = income_df[
-                        (income_df['Date'].dt.year == year) & 
-                        (income_df['Date'].dt.month == month)
-                    ]
-                    income_amount = month_data['Amount'].sum()
+                    income_amount = income_by_month.get(pd.Period(year=year, month=month, freq='M'), 0)
                     selected_incomes.append(income_amount)
                     
                     month_name = pd.Timestamp(year, month, 1).strftime('%B %Y')
@@ -129,35 +143,17 @@ def income_analytics_page():
 
     # Create monthly income trend chart
     # Aggregate income data by month
-    income_df['YearMonth'] = income_df['Date'].dt.to_period('M')
-    monthly_income_trend = income_df.groupby('YearMonth').agg({'Amount': 'sum'}).reset_index()
+    monthly_income_trend = income_by_month.rename_axis('YearMonth').reset_index()
     monthly_income_trend['Date'] = monthly_income_trend['YearMonth'].dt.to_timestamp()
     monthly_income_trend = monthly_income_trend.sort_values('Date')
     monthly_income_trend['Month'] = monthly_income_trend['Date'].dt.strftime('%b %Y')
     
     # Create and display the monthly income trend chart using a bar chart
-    fig_income_trend = px.bar(
-        monthly_income_trend,
-        x='Month',
-        y='Amount',
-        title='Monthly Income Distribution',
-        labels={'Amount': 'Income Amount', 'Month': 'Month'},
-        text_auto=True,
-        color='Amount',
-        color_continuous_scale='Viridis'
-    )
-    fig_income_trend.update_traces(
-        hovertemplate='Income: %{y:,.0f} ' + user_currency + '<extra></extra>'
-    )
-    fig_income_trend.update_layout(
-        xaxis_title="Month",
-        yaxis_title=f"Income ({user_currency})",
-        xaxis={'categoryorder': 'array', 'categoryarray': monthly_income_trend['Month'].tolist()}
-    )
+    fig_income_trend = build_monthly_income_chart(monthly_income_trend[['Month', 'Amount']], user_currency)
     st.plotly_chart(fig_income_trend, use_container_width=True)
 
     fig_savings = px.line(
-        savings_df,
+        thin_for_plot(savings_df),
         x='Date',
         y='Balance',
         title='Savings Account Balance Over Time',
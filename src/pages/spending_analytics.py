@@ -1,11 +1,12 @@
 """Spending analytics page with visualizations and metrics."""
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from ..data.processing import load_main_spending_dataframe
+from ..data.processing import load_main_spending_dataframe, slice_date_range
 from ..utils.currency import get_user_currency, format_currency, CURRENCY_SYMBOLS
-from ..utils.ui_helpers import get_spending_color
+from ..utils.ui_helpers import get_spending_color, display_paginated_dataframe, thin_for_plot
 
 
 def spending_analytics_page():
@@ -21,7 +22,10 @@ def spending_analytics_page():
             user_currency = "HUF"
             st.warning("No currency set for user, defaulting to HUF.")
         
-        spending_df = main_df[main_df['Amount'] < 0].copy()
+        # Flip spending to positive amounts once here, so no chart below needs its own copy + abs()
+        is_spending = main_df['Amount'] < 0
+        spending_df = main_df[is_spending].assign(Amount=main_df.loc[is_spending, 'Amount'].abs())
+        spending_by_month = spending_df.groupby(spending_df['Date'].dt.to_period('M'))['Amount'].sum()
 
         col1, _, col2 = st.columns([4, 1, 9])
         with col1:
@@ -37,15 +41,14 @@ def spending_analytics_page():
                 )
             )
 
-        filtered_spending_df = spending_df[
-            (spending_df['Date'].dt.date >= selected_date_range[0]) &
-            (spending_df['Date'].dt.date <= selected_date_range[1])
-        ]
+        start_date = pd.Timestamp(selected_date_range[0])
+        end_date = pd.Timestamp(selected_date_range[1]) + pd.Timedelta(days=1)
+        filtered_spending_df = slice_date_range(spending_df, start_date, end_date)
 
         with col2:    
             total_spending = filtered_spending_df['Amount'].sum()
             spending_color = get_spending_color(total_spending)
-            formatted_total = format_currency(abs(total_spending), user_currency)
+            formatted_total = format_currency(total_spending, user_currency)
             
             st.markdown(
                 f"""
@@ -68,16 +71,18 @@ def spending_analytics_page():
             )
 
         if st.checkbox("Show all spending data"):
-            st.dataframe(filtered_spending_df)
+            # Show the signed amounts as they appear on the statement
+            display_paginated_dataframe(filtered_spending_df.assign(Amount=-filtered_spending_df['Amount']), key="spending_data_page")
 
         # Monthly spending metrics
-        display_monthly_metrics(spending_df, user_currency)
+        display_monthly_metrics(spending_by_month, user_currency)
         
+        # The sections below are fragments: their own widgets rerun just that section, not the whole page
         # Month selector
-        display_month_selector(spending_df, user_currency)
+        display_month_selector(spending_df, spending_by_month, user_currency)
         
         # Balance over time chart
-        display_balance_chart(main_df, selected_date_range)
+        display_balance_chart(main_df, start_date, end_date)
         
         # Spending over time analysis
         display_spending_over_time(filtered_spending_df, user_currency)
@@ -89,13 +94,11 @@ def spending_analytics_page():
         st.error("No spending data available for analysis.")
 
 
-def display_monthly_metrics(spending_df, user_currency):
+def display_monthly_metrics(spending_by_month, user_currency):
     """Display monthly spending metrics"""
     col1, col2, col3 = st.columns(3)
-    monthly_spending = spending_df.copy()
-    monthly_spending['Date'] = monthly_spending['Date'].dt.to_period('M').dt.to_timestamp()
-    monthly_spending = monthly_spending.groupby('Date')['Amount'].sum().reset_index()
-    monthly_spending['Amount'] = monthly_spending['Amount'].abs()
+    monthly_spending = spending_by_month.rename_axis('YearMonth').reset_index()
+    monthly_spending['Date'] = monthly_spending['YearMonth'].dt.to_timestamp()
     monthly_spending = monthly_spending.sort_values(by='Date', ascending=False)
     monthly_spending['Amount_Label'] = monthly_spending['Amount'].apply(
         lambda x: format_currency(x, user_currency, compact=True)
@@ -119,7 +122,8 @@ def display_monthly_metrics(spending_df, user_currency):
                 st.metric(label="No data", value=zero_formatted, delta=zero_formatted)
 
 
-def display_month_selector(spending_df, user_currency):
+@st.fragment
+def display_month_selector(spending_df, spending_by_month, user_currency):
     """Display month selector for specific spending analysis"""
     if st.checkbox("Show spending for specific month(s)"):
         col1, col2, _ = st.columns([1, 1, 3])
@@ -139,11 +143,7 @@ def display_month_selector(spending_df, user_currency):
             
             for year in selected_years:
                 for month in selected_months:
-                    month_data = spending_df[
-                        (spending_df['Date'].dt.year == year) & 
-                        (spending_df['Date'].dt.month == month)
-                    ]
-                    spending_amount = abs(month_data['Amount'].sum())
+                    spending_amount = spending_by_month.get(pd.Period(year=year, month=month, freq='M'), 0)
                     selected_spending.append(spending_amount)
                     
                     month_name = pd.Timestamp(year, month, 1).strftime('%B %Y')
@@ -165,33 +165,107 @@ def display_month_selector(spending_df, user_currency):
                             )
 
 
-def display_balance_chart(main_df, selected_date_range):
-    """Display balance over time chart"""
-    balance_chart_data = main_df[
-        (main_df['Product'] == 'Current') &
-        (main_df['Date'].dt.date >= selected_date_range[0]) &
-        (main_df['Date'].dt.date <= selected_date_range[1])
-    ].copy()
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_balance_chart(balance_chart_data):
+    """Build the balance area chart, reused while the plotted balances are unchanged"""
+    fig_balance_over_time = px.area(
+        balance_chart_data,
+        x='Date',
+        y='Balance',
+        title='Account Balance Over Time',
+        markers=True,
+        hover_data={'Description': True}
+    )
+    fig_balance_over_time.update_traces(
+        hovertemplate='Date: %{x}<br>Balance: %{y}<br>Description: %{customdata[0]}<extra></extra>'
+    )
+    return fig_balance_over_time
+
 
-    balance_chart_data = balance_chart_data.sort_values(by='Date')
+def display_balance_chart(main_df, start_date, end_date):
+    """Display balance over time chart between start_date (inclusive) and end_date (exclusive)"""
+    balance_chart_data = slice_date_range(main_df, start_date, end_date)
+    balance_chart_data = balance_chart_data[balance_chart_data['Product'] == 'Current']
 
     if not balance_chart_data.empty:
-        fig_balance_over_time = px.area(
-            balance_chart_data,
-            x='Date',
-            y='Balance',
-            title='Account Balance Over Time',
-            markers=True,
-            hover_data={'Description': True}
-        )
-        fig_balance_over_time.update_traces(
-            hovertemplate='Date: %{x}<br>Balance: %{y}<br>Description: %{customdata[0]}<extra></extra>'
-        )
+        fig_balance_over_time = build_balance_chart(thin_for_plot(balance_chart_data[['Date', 'Balance', 'Description']]))
         st.plotly_chart(fig_balance_over_time, use_container_width=True)
     else:
         st.write("No 'Current' account balance data to display for the selected period.")
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_daily_spending_chart(daily_spending):
+    """Build the daily spending scatter, reused while the aggregated days are unchanged"""
+    fig_daily_spending = px.scatter(
+        daily_spending,
+        x='Date',
+        y='Amount',
+        title='Daily Spending Over Time',
+        text='Amount Label'
+    )
+    fig_daily_spending.update_traces(
+        marker=dict(size=7, color='white'),
+        textposition='bottom center',
+        textfont=dict(size=14, color='white'),
+        hovertemplate='Date: %{x}<br>Amount: %{y}<extra></extra>'
+    )
+    fig_daily_spending.update_layout(
+        yaxis_type="log",
+        xaxis=dict(
+            tickvals=daily_spending['Date'],
+            ticktext=daily_spending['Date'].dt.strftime('%m %d'),
+            tickangle=45
+        )
+    )
+    return fig_daily_spending
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_weekly_spending_chart(weekly_spending, currency_symbol):
+    """Build the weekly spending bar chart, reused while the aggregated weeks are unchanged"""
+    currency_label = f'Weekly Spending ({currency_symbol})'
+    
+    fig_weekly_spending = px.bar(
+        weekly_spending,
+        x='Week',
+        y='Amount',
+        title='Weekly Spending',
+        text='Amount_Label',
+        labels={'Week': 'Week', 'Amount': currency_label},
+    )
+    fig_weekly_spending.update_traces(
+        textposition='inside',
+        textfont=dict(size=18, color='black'),
+        hovertemplate='Week: %{x}<br>Weekly Spending: %{y}<extra></extra>'
+    )
+    return fig_weekly_spending
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_cumulative_spending_chart(individual_spending):
+    """Build the cumulative spending line, reused while the running totals are unchanged"""
+    fig_spending_add_up = px.line(
+        individual_spending,
+        x='Date',
+        y='CumSum',
+        title='Cumulative Spending Over Time',
+        markers=True,
+        hover_data={'Description': True}
+    )
+    fig_spending_add_up.update_layout(
+        yaxis_title=None,
+        xaxis_title='Date',
+    )
+    fig_spending_add_up.update_traces(
+        marker=dict(size=7),
+        hovertemplate='Date: %{x}<br>Total: %{y}<br>Description: %{customdata[0]}<extra></extra>'
+    )
+    fig_spending_add_up.update_traces(customdata=individual_spending[['Description']].values)
+    return fig_spending_add_up
+
+
+@st.fragment
 def display_spending_over_time(filtered_spending_df, user_currency):
     """Display spending over time analysis with different views"""
     col1, _ = st.columns([1, 4])
@@ -202,13 +276,10 @@ def display_spending_over_time(filtered_spending_df, user_currency):
         )
 
     if spending_ot_selector == "Individual Transactions":
-        individual_spending = filtered_spending_df.copy()
-        individual_spending['Amount'] = individual_spending['Amount'].abs()
-        individual_spending = individual_spending.sort_values(by='Date')
-        
-        threshold = individual_spending['Amount'].quantile(0.9)
-        individual_spending['Color'] = individual_spending['Amount'].apply(
-            lambda x: 'red' if x >= threshold else 'white'
+        # Rows are already in Date order, so just add the color column to a new frame
+        threshold = filtered_spending_df['Amount'].quantile(0.9)
+        individual_spending = filtered_spending_df.assign(
+            Color=np.where(filtered_spending_df['Amount'].to_numpy() >= threshold, 'red', 'white')
         )
 
         fig_individual_spending = px.scatter(
@@ -232,40 +303,24 @@ def display_spending_over_time(filtered_spending_df, user_currency):
         st.plotly_chart(fig_individual_spending, use_container_width=True)
 
     elif spending_ot_selector == "Daily":
-        daily_spending = filtered_spending_df.groupby(filtered_spending_df['Date'].dt.date)['Amount'].sum().reset_index()
-        daily_spending['Amount'] = daily_spending['Amount'].abs()
+        # Group on midnight timestamps so Date stays datetime64 instead of Python date objects
+        daily_spending = filtered_spending_df.groupby(filtered_spending_df['Date'].dt.normalize())['Amount'].sum().reset_index()
         daily_spending = daily_spending.sort_values(by='Date')
-        daily_spending['Amount Label'] = daily_spending['Amount'].apply(lambda x: f'{x/1000:.0f}k' if x >= 1000 else f'{x:.0f}')
+        # Round and stringify the whole column at once instead of formatting each day in Python
+        amounts = daily_spending['Amount'].to_numpy(dtype=float)
+        is_thousands = amounts >= 1000
+        rounded = np.round(np.where(is_thousands, amounts / 1000, amounts)).astype(np.int64).astype(str)
+        daily_spending['Amount Label'] = np.where(is_thousands, np.char.add(rounded, 'k'), rounded)
         
-        fig_daily_spending = px.scatter(
-            daily_spending,
-            x='Date',
-            y='Amount',
-            title='Daily Spending Over Time',
-            text='Amount Label'
-        )
-        fig_daily_spending.update_traces(
-            marker=dict(size=7, color='white'),
-            textposition='bottom center',
-            textfont=dict(size=14, color='white'),
-            hovertemplate='Date: %{x}<br>Amount: %{y}<extra></extra>'
-        )
-        fig_daily_spending.update_layout(
-            yaxis_type="log",
-            xaxis=dict(
-                tickvals=daily_spending['Date'],
-                ticktext=[date.strftime('%m %d') for date in daily_spending['Date']],
-                tickangle=45
-            )
-        )
+        fig_daily_spending = build_daily_spending_chart(daily_spending[['Date', 'Amount', 'Amount Label']])
         st.plotly_chart(fig_daily_spending, use_container_width=True)
 
         if st.checkbox("Show heatmap"):
             st.subheader("Heatmap of Daily Spending")
-            daily_spending['Date'] = pd.to_datetime(daily_spending['Date'])
             daily_spending['Day_of_Week'] = daily_spending['Date'].dt.day_name()
             daily_spending['Week'] = daily_spending['Date'].dt.isocalendar().week
-            daily_spending['Month'] = daily_spending['Date'].dt.strftime('%Y-%m')
+            # Periods group and sort natively; they only become text in each heatmap's title
+            daily_spending['Month'] = daily_spending['Date'].dt.to_period('M')
                     
             sorted_months = sorted(daily_spending['Month'].unique())
                     
@@ -286,18 +341,18 @@ def display_spending_over_time(filtered_spending_df, user_currency):
                 cols = st.columns(2)  # 2x3 layout
                 col_positions = [i % 2 for i in range(num_months)]
                     
+            # Pivot every month at once and slice each month out, instead of filtering and pivoting per month.
+            # daily_spending has one row per day, so each (month, week, weekday) cell holds a single day.
+            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+            heatmap_all = pd.crosstab(
+                index=[daily_spending['Month'], daily_spending['Week']],
+                columns=daily_spending['Day_of_Week'],
+                values=daily_spending['Amount'],
+                aggfunc='sum'
+            ).reindex(columns=day_order).fillna(0)
+                    
             for i, month in enumerate(sorted_months):
-                month_data = daily_spending[daily_spending['Month'] == month]
-                        
-                heatmap_data = month_data.pivot_table(
-                    index='Week',
-                    columns='Day_of_Week',
-                    values='Amount',
-                    fill_value=0
-                )
-                        
-                day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                heatmap_data = heatmap_data.reindex(columns=day_order, fill_value=0)
+                heatmap_data = heatmap_all.xs(month, level='Month')
                         
                 fig_heatmap_daily = px.imshow(
                     heatmap_data,
@@ -322,66 +377,34 @@ def display_spending_over_time(filtered_spending_df, user_currency):
                     st.plotly_chart(fig_heatmap_daily, use_container_width=True)
 
     elif spending_ot_selector == "Weekly":
-        weekly_spending = filtered_spending_df.copy()
-        weekly_spending['Amount'] = weekly_spending['Amount'].abs()
-        weekly_spending['Week'] = weekly_spending['Date'].dt.to_period('W').dt.start_time
-        weekly_spending = weekly_spending.groupby('Week')['Amount'].sum().reset_index()
+        week_start = filtered_spending_df['Date'].dt.to_period('W').dt.start_time.rename('Week')
+        weekly_spending = filtered_spending_df.groupby(week_start)['Amount'].sum().reset_index()
         weekly_spending = weekly_spending.sort_values(by='Week')
         weekly_spending['Amount_Label'] = weekly_spending['Amount'].apply(
             lambda x: format_currency(x, user_currency, compact=True, show_symbol=False)
         )
-        currency_label = f'Weekly Spending ({CURRENCY_SYMBOLS.get(user_currency, user_currency)})'
-        
-        fig_weekly_spending = px.bar(
-            weekly_spending,
-            x='Week',
-            y='Amount',
-            title='Weekly Spending',
-            text='Amount_Label',
-            labels={'Week': 'Week', 'Amount': currency_label},
-        )
-        fig_weekly_spending.update_traces(
-            textposition='inside',
-            textfont=dict(size=18, color='black'),
-            hovertemplate='Week: %{x}<br>Weekly Spending: %{y}<extra></extra>'
-        )
+        fig_weekly_spending = build_weekly_spending_chart(weekly_spending, CURRENCY_SYMBOLS.get(user_currency, user_currency))
         
         st.plotly_chart(fig_weekly_spending, use_container_width=True)
 
 
+@st.fragment
 def display_cumulative_and_top_spending(filtered_spending_df, user_currency):
     """Display cumulative spending and top transactions"""
     col1, col2 = st.columns([3, 2])
     
     with col1:
-        individual_spending = filtered_spending_df.copy()
-        individual_spending['Amount'] = individual_spending['Amount'].abs()
-        individual_spending = individual_spending.sort_values(by='Date')
-        individual_spending['CumSum'] = individual_spending['Amount'].cumsum()
+        # Rows are already in Date order, so the running total needs no sort first
+        individual_spending = filtered_spending_df.assign(CumSum=filtered_spending_df['Amount'].cumsum())
+        # Thin after the running total so the plotted points still carry the true totals
+        individual_spending = thin_for_plot(individual_spending[['Date', 'CumSum', 'Description']])
         
-        fig_spending_add_up = px.line(
-            individual_spending,
-            x='Date',
-            y='CumSum',
-            title='Cumulative Spending Over Time',
-            markers=True,
-            hover_data={'Description': True}
-        )
-        fig_spending_add_up.update_layout(
-            yaxis_title=None,
-            xaxis_title='Date',
-        )
-        fig_spending_add_up.update_traces(
-            marker=dict(size=7),
-            hovertemplate='Date: %{x}<br>Total: %{y}<br>Description: %{customdata[0]}<extra></extra>'
-        )
-        fig_spending_add_up.update_traces(customdata=individual_spending[['Description']].values)
+        fig_spending_add_up = build_cumulative_spending_chart(individual_spending)
         st.plotly_chart(fig_spending_add_up, use_container_width=True)
 
     with col2:
-        top_10_spending = filtered_spending_df.copy()
-        top_10_spending['Amount'] = top_10_spending['Amount'].abs()
-        top_10_spending = top_10_spending.sort_values(by='Amount', ascending=False).head(10)
+        # Partial selection of the 10 largest instead of sorting every row
+        top_10_spending = filtered_spending_df.nlargest(10, 'Amount')
         
         col1, _, col2 = st.columns([2, 1, 1])
         with col1:
@@ -389,17 +412,10 @@ def display_cumulative_and_top_spending(filtered_spending_df, user_currency):
         with col2:
             show_dates_checkbox = st.checkbox("Show dates", value=False)
 
-        if show_dates_checkbox:
-            display_columns = ['Description', 'Amount', 'Date']
-            formatted_df = top_10_spending[display_columns].copy()
-            formatted_df['Amount'] = formatted_df['Amount'].apply(
-                lambda x: format_currency(x, user_currency, compact=True)
-            )
-        else:
-            display_columns = ['Description', 'Amount'] 
-            formatted_df = top_10_spending[display_columns].copy()
-            formatted_df['Amount'] = formatted_df['Amount'].apply(
-                lambda x: format_currency(x, user_currency, compact=True)
-            )
+        display_columns = ['Description', 'Amount', 'Date'] if show_dates_checkbox else ['Description', 'Amount']
+        formatted_df = top_10_spending[display_columns]
+        formatted_df['Amount'] = formatted_df['Amount'].apply(
+            lambda x: format_currency(x, user_currency, compact=True)
+        )
         
         st.dataframe(formatted_df, hide_index=True, use_container_width=True)
@@ -4,7 +4,8 @@ import streamlit as st
 import time
 from ..data.github_storage import delete_user_data
 from ..auth.authentication import change_password
-from ..data.github_storage import get_user_files, read_encrypted_github_file
+from ..data.github_storage import get_user_files, read_encrypted_github_file, github_file_exists
+from ..data.processing import load_main_dataframe, read_main_dataframe
 from ..utils.currency import get_user_currency
 
 
@@ -40,8 +41,11 @@ def user_settings_page():
                         st.write("No keywords defined")
     
     with st.expander("➕ Add New Category"):
-        new_category = st.text_input("Category Name")
-        if st.button("Create Category") and new_category:
+        # Forms batch the inputs into one rerun on submit instead of one per keystroke
+        with st.form("settings_add_category_form", clear_on_submit=True):
+            new_category = st.text_input("Category Name")
+            create_button = st.form_submit_button("Create Category")
+        if create_button and new_category:
             if new_category not in st.session_state.categories:
                 st.session_state.categories[new_category] = []
                 from ..data.processing import save_categories
@@ -55,13 +59,16 @@ def user_settings_page():
     
     st.markdown("#### Change Password")
     with st.expander("🔐 Change Your Password"):
-        col1, col2 = st.columns(2)
-        with col1:
-            old_password = st.text_input("Current Password", type="password", key="settings_old_password")
-            new_password = st.text_input("New Password", type="password", key="settings_new_password")
-            confirm_new_password = st.text_input("Confirm New Password", type="password", key="settings_confirm_password")
-        
-        if st.button("Update Password", type="primary"):
+        with st.form("settings_change_password_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                old_password = st.text_input("Current Password", type="password", key="settings_old_password")
+                new_password = st.text_input("New Password", type="password", key="settings_new_password")
+                confirm_new_password = st.text_input("Confirm New Password", type="password", key="settings_confirm_password")
+            
+            update_button = st.form_submit_button("Update Password", type="primary")
+
+        if update_button:
             if change_password(st.session_state.username, old_password, new_password, confirm_new_password):
                 st.success("Password updated successfully!")
                 time.sleep(2)
@@ -78,7 +85,8 @@ def user_settings_page():
         files = get_user_files(st.session_state.username)
         
         # Check if files exist
-        dataframe_exists = read_encrypted_github_file(files["dataframe"], st.session_state.username) is not None
+        # Goes through the cached loader, which also finds data still stored as CSV
+        dataframe_exists = load_main_dataframe() is not None
         categories_exists = read_encrypted_github_file(files["categories"], st.session_state.username) is not None
         
         if dataframe_exists:
@@ -95,7 +103,12 @@ def user_settings_page():
     
     with col2:
         st.markdown("**Storage Location:**")
-        st.write(f"📁 Dataframe: `{files['dataframe']}`")
+        # Data not re-saved since the switch to Parquet is still only in the legacy CSV
+        if dataframe_exists and not github_file_exists(files["dataframe"]):
+            dataframe_file = files["legacy_dataframe"]
+        else:
+            dataframe_file = files["dataframe"]
+        st.write(f"📁 Dataframe: `{dataframe_file}`")
         st.write(f"📁 Categories: `{files['categories']}`")
         st.write(f"🔐 Data is encrypted with your password")
     
@@ -125,11 +138,13 @@ def user_settings_page():
                 with st.spinner("Deleting your account..."):
                     success, message = delete_user_data(username)
                 if success:
+                    # Drop the cached dataframe so a new account with this name starts empty
+                    read_main_dataframe.clear(username)
                     st.success("Account deleted successfully!")
                     st.info("You will be logged out in 3 seconds...")
                     time.sleep(3)
                     # Reset session state
-                    for key in ["logged_in", "username", "is_guest"]:
+                    for key in ["logged_in", "username", "is_guest", "setup_checked_for"]:
                         if key in st.session_state:
                             del st.session_state[key]
                     st.session_state.categories = {"Uncategorized": []}
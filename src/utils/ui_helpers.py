@@ -1,5 +1,9 @@
 """Utility functions for UI and data visualization."""
 
+import math
+import streamlit as st
+
+
 def get_spending_color(amount):
     """Get color for spending amount visualization"""
     amount = abs(amount)
@@ -16,3 +20,23 @@ def get_spending_color(amount):
     b = int(salmon_b + (dark_red_b - salmon_b) * normalized)
     
     return f"rgb({r}, {g}, {b})"
+
+
+def thin_for_plot(df, max_points=3000):
+    """Keep every k-th row (and the last one) so at most about max_points are sent to a line chart"""
+    step = math.ceil(len(df) / max_points)
+    if step <= 1:
+        return df
+    return df.iloc[sorted({*range(0, len(df), step), len(df) - 1})]
+
+
+def display_paginated_dataframe(df, page_size=200, key=None):
+    """Display a dataframe one page at a time so only the visible rows are sent to the browser"""
+    num_pages = max(1, math.ceil(len(df) / page_size))
+    page = 1
+    if num_pages > 1:
+        col1, _ = st.columns([1, 5])
+        with col1:
+            page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, step=1, key=key)
+
+    st.dataframe(df.iloc[(page - 1) * page_size:page * page_size])